@@ -6,7 +6,9 @@ This script reads WiFi performance data from a CSV file and creates a comparison
 showing throughput ranges, average speeds, and signal strength for different routers.
 
 Usage:
-    uv run plot.py
+    uv run plot.py              # save the PNG, show it when run from a desktop terminal
+    uv run plot.py --show       # always open an interactive matplotlib window
+    uv run plot.py --no-show    # save the PNG only (headless Agg backend)
 
 Data Format:
     Expected CSV format: {FILENAME_PREFIX}.csv
@@ -28,12 +30,22 @@ The script can also be run directly as ./plot.py after chmod +x plot.py
 #     "pandas",
 #     "matplotlib",
 #     "numpy",
+#     "pyarrow",
 # ]
 # ///
 
+import argparse
+import itertools
+import os
+import sys
+
 import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -41,21 +53,79 @@ DATA_DIR = (SCRIPT_DIR / "../data").resolve()
 FILENAME_PREFIX = "UniFi-WiFi-Placement-2025-06-24"
 csv_filename = DATA_DIR / f"{FILENAME_PREFIX}.csv"
 png_filename = DATA_DIR / f"{FILENAME_PREFIX}.png"
+# Cached copy of the cleaned CSV data, rebuilt whenever the CSV or the schema changes
+parquet_filename = DATA_DIR / f"{FILENAME_PREFIX}.parquet"
+# Only open a window by default when run from a terminal with a display (not CI/SSH):
+# assume one on macOS and Windows; X11/Wayland sessions set $DISPLAY/$WAYLAND_DISPLAY
+INTERACTIVE = sys.stdout.isatty() and (
+    sys.platform in ("darwin", "win32")
+    or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+)
 
 
 def main():
     """Main function to run the WiFi performance analysis and plotting."""
+    parser = argparse.ArgumentParser(description="Plot WiFi performance by spot.")
+    parser.add_argument(
+        "--show",
+        action=argparse.BooleanOptionalAction,
+        default=INTERACTIVE,
+        help="open an interactive matplotlib window after saving the PNG "
+        "(default: on a terminal under macOS, Windows, or with $DISPLAY or "
+        "$WAYLAND_DISPLAY set)",
+    )
+    args = parser.parse_args()
+    if not args.show:
+        # Headless: Agg renders the PNG without loading a GUI backend
+        matplotlib.use("Agg")
+
     df = load_and_clean_data()
     data_validation(df)
-    make_plot(df)
+    make_plot(df, show=args.show)
 
 
 def load_and_clean_data():
-    """Load CSV data and clean column names."""
-    df = pd.read_csv(csv_filename)
+    """Load CSV data with clean column names and explicit dtypes.
+
+    Reads the Parquet cache instead when it was built from the current CSV
+    (same mtime) with the current column names and dtypes.
+    """
+    # Clean column names (remove special characters) mapped to explicit dtypes:
+    # grouping keys as categoricals, numeric columns as compact types
+    dtypes = {
+        "Spot": "category",
+        "Router": "category",
+        "Client": "category",
+        "Signal_dBm": "int16",
+        "Down_Mbps": "float32",
+        "Up_Mbps": "float32",
+    }
+    csv_mtime_ns = csv_filename.stat().st_mtime_ns
+
+    if (
+        parquet_filename.exists()
+        and parquet_filename.stat().st_mtime_ns == csv_mtime_ns
+    ):
+        df = pd.read_parquet(parquet_filename)
+        if df.dtypes.astype(str).to_dict() == dtypes:
+            print(f"✓ Read cached data from: {parquet_filename}")
+            return df
+
+    df = pd.read_csv(
+        csv_filename,
+        header=0,
+        names=list(dtypes),
+        usecols=range(len(dtypes)),
+        dtype=dtypes,
+        engine="c",
+    )
     print(f"✓ Read data from: {csv_filename}")
-    # Clean column names (remove special characters)
-    df.columns = ["Spot", "Router", "Client", "Signal_dBm", "Down_Mbps", "Up_Mbps"]
+    try:
+        df.to_parquet(parquet_filename, index=False)
+        # Stamp the cache with the CSV's mtime; any other CSV mtime invalidates it
+        os.utime(parquet_filename, ns=(csv_mtime_ns, csv_mtime_ns))
+    except OSError as e:
+        print(f"  ⚠ Could not write cache {parquet_filename}: {e}")
     return df
 
 
@@ -63,17 +133,20 @@ def data_validation(df):
     """Validate data quality and completeness."""
     print(f"  ✓ Dataset contains {len(df)} measurements")
 
-    # Discover all unique values from the data
-    all_spots = sorted(df["Spot"].unique())
-    all_routers = sorted(df["Router"].unique())
-    all_clients = sorted(df["Client"].unique())
+    # Discover all unique values from the data (categories are already sorted)
+    all_spots = list(df["Spot"].cat.categories)
+    all_routers = list(df["Router"].cat.categories)
+    all_clients = list(df["Client"].cat.categories)
 
     print(f"  ✓ Unique spots: {all_spots}")
     print(f"  ✓ Unique routers: {all_routers}")
     print(f"  ✓ Unique clients: {all_clients}")
 
+    # Min/max of every numeric column in one pass
+    ranges = df[["Signal_dBm", "Down_Mbps", "Up_Mbps"]].agg(["min", "max"])
+
     # Signal_dBm should all be negative (stronger signal = closer to 0)
-    signal_min, signal_max = df["Signal_dBm"].min(), df["Signal_dBm"].max()
+    signal_min, signal_max = ranges["Signal_dBm"]
     print(f"  ✓ Signal strength range: {signal_min} to {signal_max} dBm")
     assert signal_max <= 0, (
         f"Found positive signal strength: {signal_max} dBm (should be negative)"
@@ -83,10 +156,10 @@ def data_validation(df):
     )
 
     # Download and Upload speeds should be positive
-    down_min, down_max = df["Down_Mbps"].min(), df["Down_Mbps"].max()
-    up_min, up_max = df["Up_Mbps"].min(), df["Up_Mbps"].max()
-    print(f"  ✓ Download speed range: {down_min} to {down_max} Mbps")
-    print(f"  ✓ Upload speed range: {up_min} to {up_max} Mbps")
+    down_min, down_max = ranges["Down_Mbps"]
+    up_min, up_max = ranges["Up_Mbps"]
+    print(f"  ✓ Download speed range: {down_min:g} to {down_max:g} Mbps")
+    print(f"  ✓ Upload speed range: {up_min:g} to {up_max:g} Mbps")
     assert down_min > 0, f"Found non-positive download speed: {down_min} Mbps"
     assert up_min > 0, f"Found non-positive upload speed: {up_min} Mbps"
 
@@ -96,147 +169,147 @@ def data_validation(df):
         f"  ✓ Expected combinations (spots × routers × clients): {expected_combinations}"
     )
 
-    for router in all_routers:
-        for client in all_clients:
-            for spot in all_spots:
-                subset = df[
-                    (df["Router"] == router)
-                    & (df["Client"] == client)
-                    & (df["Spot"] == spot)
-                ]
-                if subset.empty:
-                    raise ValueError(
-                        f"Missing data for Router='{router}', Client='{client}', Spot='{spot}'"
-                    )
+    # Happy path is a single length check; missing tuples are only listed on failure
+    counts = df.groupby(["Router", "Client", "Spot"], sort=False, observed=True).size()
+    if len(counts) != expected_combinations:
+        missing = sorted(
+            set(itertools.product(all_routers, all_clients, all_spots))
+            - set(counts.index)
+        )
+        raise ValueError(
+            f"Missing data for (Router, Client, Spot) combinations: {missing}"
+        )
 
     print("  ✓ Data validation passed!")
     print("  ✓ Complete data validation passed!")
 
 
-def make_plot(df):
+def make_plot(df, show=False):
     """Create the WiFi performance comparison plot."""
-    # Group by router and spot to calculate statistics
-    grouped = (
-        df.groupby(["Router", "Spot"])
-        .apply(calculate_stats, include_groups=False)
-        .reset_index()
+    # Group by router and spot to calculate statistics (indexed by Router, Spot)
+    grouped = df.groupby(["Router", "Spot"], sort=False, observed=True).agg(
+        Down_min=("Down_Mbps", "min"),
+        Down_max=("Down_Mbps", "max"),
+        Down_mean=("Down_Mbps", "mean"),
+        Up_min=("Up_Mbps", "min"),
+        Up_max=("Up_Mbps", "max"),
+        Up_mean=("Up_Mbps", "mean"),
+        RSSI_mean=("Signal_dBm", "mean"),
+        # Per-group totals so spot averages stay weighted by measurement count
+        Down_sum=("Down_Mbps", "sum"),
+        n=("Down_Mbps", "size"),
     )
 
-    # Separate router data
-    routers = sorted(df["Router"].unique())
-    router_data = {}
-    for router in routers:
-        router_data[router] = grouped[grouped["Router"] == router].copy()
+    routers = list(df["Router"].cat.categories)
 
     # Define spot order based on average download speed - slowest to fastest
     # Fixed order ensures all routers' data aligns at same x-positions for proper comparison
-    spot_down_avg = df.groupby("Spot")["Down_Mbps"].mean().sort_values()
+    spot_totals = grouped.groupby(level="Spot", sort=False, observed=True)[
+        ["Down_sum", "n"]
+    ].sum()
+    spot_down_avg = (spot_totals["Down_sum"] / spot_totals["n"]).sort_values()
     spot_order = spot_down_avg.index.tolist()
 
     print("✓ Spots ordered by average download speed (slowest to fastest)")
     x_positions = np.arange(len(spot_order))
 
-    # Prepare data for each router
-    plot_data = {}
-    for i, router in enumerate(routers):
-        # All routers use same x-positions - colors/styles distinguish them
-        x_pos = x_positions
-
-        # Reorder data to match spot_order
-        reordered = []
-        for spot in spot_order:
-            router_spot = router_data[router][router_data[router]["Spot"] == spot]
-            reordered.append(router_spot.iloc[0])
-
-        data = pd.DataFrame(reordered)
+    # Align every router's stats to spot_order with one MultiIndex reindex
+    router_spot_stats = grouped.drop(columns=["Down_sum", "n"]).reindex(
+        pd.MultiIndex.from_product([routers, spot_order], names=["Router", "Spot"])
+    )
 
-        plot_data[router] = {"x": x_pos, "data": data}
+    # All metrics in one contiguous (routers × spots × metrics) float64 block (the
+    # aggregates mix float32 and float64, so this single conversion is the only copy).
+    # Each metric is a strided (routers × spots) view into it, one row per router.
+    shape = (len(routers), len(spot_order))
+    stats = router_spot_stats.to_numpy(dtype=np.float64).reshape(*shape, -1)
+    metrics = {
+        column: stats[:, :, k] for k, column in enumerate(router_spot_stats.columns)
+    }
+
+    # Calculate overall throughput ranges into preallocated buffers
+    min_overall = np.empty(shape)
+    max_overall = np.empty(shape)
+    np.minimum(metrics["Down_min"], metrics["Up_min"], out=min_overall)
+    np.maximum(metrics["Down_max"], metrics["Up_max"], out=max_overall)
 
     # Create the plot
-    fig, ax1 = plt.subplots(figsize=(12, 6))
+    fig, ax1 = plt.subplots(figsize=(12, 6), layout="constrained")
 
     # Colors for each router
     colors = ["orange", "blue", "green", "red", "purple"]
+    router_colors = [colors[i % len(colors)] for i in range(len(routers))]
 
-    for i, router in enumerate(routers):
-        x = plot_data[router]["x"]
-        data = plot_data[router]["data"]
-        color = colors[i % len(colors)]
+    # All routers use same x-positions - colors/styles distinguish them
+    x = np.broadcast_to(x_positions, shape)
 
-        # Calculate overall throughput ranges
-        min_overall = np.minimum(
-            np.array(data["Down_min"], dtype=np.float64),
-            np.array(data["Up_min"], dtype=np.float64),
-        )
-        max_overall = np.maximum(
-            np.array(data["Down_max"], dtype=np.float64),
-            np.array(data["Up_max"], dtype=np.float64),
-        )
+    def segments(y):
+        """Stack (routers × spots) y-values into one polyline per router."""
+        return np.stack([x, y], axis=-1)
 
-        # Extract plotting data
-        up_mean = np.array(data["Up_mean"], dtype=np.float64)
-        down_mean = np.array(data["Down_mean"], dtype=np.float64)
-        rssi_mean = np.array(data["RSSI_mean"], dtype=np.float64)
-
-        # Fill shaded throughput ranges
-        ax1.fill_between(
-            x,
-            min_overall,
-            max_overall,
-            color=color,
-            alpha=0.2,
-            label=f"{router} Range",
-        )
+    # Fill shaded throughput ranges (min along the bottom, max back along the top)
+    range_verts = np.concatenate(
+        [segments(min_overall), segments(max_overall)[:, ::-1]], axis=1
+    )
+    # Rasterized so vector outputs composite the fills into one image layer
+    ax1.add_collection(
+        PolyCollection(range_verts, color=router_colors, alpha=0.2, rasterized=True)
+    )
 
-        # Average up/down lines
-        ax1.plot(x, up_mean, color=color, linestyle="--", label=f"{router} Avg Up")
-        ax1.plot(x, down_mean, color=color, linestyle="-.", label=f"{router} Avg Down")
+    # Average up/down lines
+    ax1.add_collection(
+        LineCollection(
+            segments(metrics["Up_mean"]), colors=router_colors, linestyles="--"
+        )
+    )
+    ax1.add_collection(
+        LineCollection(
+            segments(metrics["Down_mean"]), colors=router_colors, linestyles="-."
+        )
+    )
+    ax1.autoscale_view()
 
     ax1.set_ylabel("Throughput (Mbps)")
     ax1.set_xlabel("Measurement Spot")
-    ax1.set_xticks(x_positions)
-    ax1.set_xticklabels(spot_order, rotation=45, ha="right")
+    ax1.set_xticks(x_positions, labels=spot_order, rotation=45, ha="right")
 
     # RSSI on secondary axis
     ax2 = ax1.twinx()
-    for i, router in enumerate(routers):
-        x = plot_data[router]["x"]
-        data = plot_data[router]["data"]
-        color = colors[i % len(colors)]
-        rssi_mean = np.array(data["RSSI_mean"], dtype=np.float64)
-        ax2.plot(x, rssi_mean, "o--", color=color, label=f"{router} Avg RSSI")
+    rssi_mean = metrics["RSSI_mean"]
+    ax2.add_collection(
+        LineCollection(segments(rssi_mean), colors=router_colors, linestyles="--")
+    )
+    ax2.scatter(
+        x.ravel(), rssi_mean.ravel(), color=np.repeat(router_colors, x.shape[1])
+    )
 
     ax2.set_ylabel("Signal Strength (dBm)")
     ax2.set_ylim(-90, -20)
 
-    # Combined legend
-    lines_1, labels_1 = ax1.get_legend_handles_labels()
-    lines_2, labels_2 = ax2.get_legend_handles_labels()
-    ax1.legend(lines_1 + lines_2, labels_1 + labels_2, loc="upper left", fontsize=10)
+    # Combined legend: collections carry no per-router labels, so build the entries
+    # for both axes in one pass (ax1 entries first, then the RSSI entries)
+    handles_1, labels_1, handles_2, labels_2 = [], [], [], []
+    for router, color in zip(routers, router_colors):
+        handles_1 += [
+            Patch(color=color, alpha=0.2),
+            Line2D([], [], color=color, linestyle="--"),
+            Line2D([], [], color=color, linestyle="-."),
+        ]
+        labels_1 += [f"{router} Range", f"{router} Avg Up", f"{router} Avg Down"]
+        handles_2.append(Line2D([], [], color=color, marker="o", linestyle="--"))
+        labels_2.append(f"{router} Avg RSSI")
+    ax1.legend(
+        handles_1 + handles_2, labels_1 + labels_2, loc="upper left", fontsize=10
+    )
 
     plt.title("WiFi Performance and Signal Strength by Spot")
-    plt.tight_layout()
 
     # Save as PNG file
-    plt.savefig(png_filename, dpi=300, bbox_inches="tight")
+    plt.savefig(png_filename, dpi=300)
     print(f"✓ Plot saved as: {png_filename}")
 
-    plt.show()
-
-
-def calculate_stats(group):
-    """Calculate summary statistics for a group of measurements at the same location+router combination."""
-    return pd.Series(
-        {
-            "Down_min": group["Down_Mbps"].min(),
-            "Down_max": group["Down_Mbps"].max(),
-            "Down_mean": group["Down_Mbps"].mean(),
-            "Up_min": group["Up_Mbps"].min(),
-            "Up_max": group["Up_Mbps"].max(),
-            "Up_mean": group["Up_Mbps"].mean(),
-            "RSSI_mean": group["Signal_dBm"].mean(),
-        }
-    )
+    if show:
+        plt.show()
 
 
 if __name__ == "__main__":